@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 SkyWater PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+
+
+def collect_lefs(library_path):
+    """Collect the non-magic ``.lef`` files of a library's cells.
+
+    Cell data always lives at ``cells/<cell>/<file>.lef``, so only the two
+    relevant directory levels are read (with ``os.scandir`` so the file /
+    directory checks reuse the information returned by the OS while
+    reading each directory).
+    """
+    lefs = []
+    with os.scandir(os.path.join(library_path, "cells")) as cells_it:
+        for cell_entry in cells_it:
+            if not cell_entry.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(cell_entry.path) as cell_it:
+                for entry in cell_it:
+                    if entry.name.endswith(".lef") and \
+                            not entry.name.endswith("magic.lef") and \
+                            entry.is_file(follow_symlinks=False):
+                        lefs.append(entry.path)
+    lefs.sort()
+    return lefs
+
+
+def main(args):
+    if len(args) != 1:
+        print("Usage: createLefList.py <library_path>")
+        return 1
+
+    library_path = args[0]
+    lefs = collect_lefs(library_path)
+
+    out_fname = os.path.basename(os.path.normpath(library_path)) + ".lefs"
+    with open(out_fname, "w") as f:
+        f.write(" \\\n".join(lefs))
+        f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
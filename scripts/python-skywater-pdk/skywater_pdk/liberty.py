@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 SkyWater PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import concurrent.futures
+import enum
+import functools
+import json
+import operator
+import os
+import pathlib
+import sys
+
+from typing import Tuple, List, Dict
+
+from . import sizes
+
+# orjson (or failing that, ujson) parses the large .lib.json files several
+# times faster than the stdlib module.  Fall back gracefully when neither
+# is installed.
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        _json = json
+
+
+class TimingType(enum.IntFlag):
+    """Type of timing information found in a ``.lib.json`` file.
+
+    >>> TimingType.parse("ff_100C_1v65")
+    ('ff_100C_1v65', <TimingType.basic: 4>)
+
+    >>> TimingType.parse("ff_100C_1v65_ccsnoise")
+    ('ff_100C_1v65', <TimingType.ccsnoise: 1>)
+
+    >>> TimingType.parse("ff_100C_1v65_pwrlkg")
+    ('ff_100C_1v65', <TimingType.leakage: 2>)
+
+    >>> (TimingType.basic | TimingType.ccsnoise).types
+    [<TimingType.ccsnoise: 1>, <TimingType.basic: 4>]
+
+    >>> TimingType.basic.singular
+    True
+    >>> (TimingType.basic | TimingType.leakage).singular
+    False
+    """
+
+    ccsnoise = 1
+    leakage = 2
+    basic = 4
+
+    @property
+    def file(self):
+        """Filename suffix for this timing type.
+
+        >>> TimingType.basic.file
+        ''
+        >>> TimingType.ccsnoise.file
+        '_ccsnoise'
+        >>> TimingType.leakage.file
+        '_pwrlkg'
+        """
+        return _TIMING_TYPE_FILES.get(self, "")
+
+    @property
+    def types(self):
+        """Individual timing types contained in this flag value."""
+        return [t for t in TimingType if t in self]
+
+    @property
+    def singular(self):
+        """Whether this value contains a single timing type."""
+        return len(self.types) == 1
+
+    @classmethod
+    def parse(cls, name):
+        """Split a corner name into the corner and its timing type."""
+        head, _, tail = name.rpartition("_")
+        ttype = _TIMING_TYPE_SUFFIXES.get(tail)
+        if ttype is None:
+            return name, cls.basic
+        return head, ttype
+
+
+# Filename suffixes marking non-basic timing data, keyed by the last
+# '_'-separated component of the corner name.
+_TIMING_TYPE_SUFFIXES = {
+    "ccsnoise": TimingType.ccsnoise,
+    "pwrlkg": TimingType.leakage,
+}
+
+_TIMING_TYPE_FILES = {
+    TimingType.basic: "",
+    TimingType.ccsnoise: "_ccsnoise",
+    TimingType.leakage: "_pwrlkg",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def cell_corner_file(libname, cell_with_size, corner, corner_type):
+    """Get the path (relative to the library) of a cell's corner data.
+
+    The same arguments repeat across the collect() sanity checks and
+    generate(), so the built paths are memoized.
+
+    >>> cell_corner_file('sky130_fd_sc_hd', 'a2111o_1', 'ff_100C_1v65', TimingType.basic)
+    'cells/a2111o/sky130_fd_sc_hd__a2111o_1__ff_100C_1v65.lib.json'
+    >>> cell_corner_file('sky130_fd_sc_hd', 'a2111o_1', 'ff_100C_1v65', TimingType.ccsnoise)
+    'cells/a2111o/sky130_fd_sc_hd__a2111o_1__ff_100C_1v65_ccsnoise.lib.json'
+    """
+    assert corner_type.singular, (libname, cell_with_size, corner, corner_type)
+    cell = cell_with_size
+    if "_" in cell_with_size:
+        sz = sizes.parse_size("_" + cell_with_size.rsplit("_", 1)[-1])
+        if sz is not None:
+            cell = cell_with_size[:-len(sz.suffix)]
+    fname = "{libname}__{cell_with_size}__{corner}{corner_suffix}.lib.json".format(
+        libname=libname, cell_with_size=cell_with_size,
+        corner=corner, corner_suffix=corner_type.file)
+    return os.path.join("cells", cell, fname)
+
+
+@functools.lru_cache(maxsize=None)
+def top_corner_file(libname, corner, corner_type):
+    """Get the path (relative to the library) of a corner's top level data.
+
+    >>> top_corner_file('sky130_fd_sc_hd', 'ff_100C_1v65', TimingType.basic)
+    'timing/sky130_fd_sc_hd__ff_100C_1v65.lib.json'
+    >>> top_corner_file('sky130_fd_sc_hd', 'ff_100C_1v65', TimingType.leakage)
+    'timing/sky130_fd_sc_hd__ff_100C_1v65_pwrlkg.lib.json'
+    """
+    assert corner_type.singular, (libname, corner, corner_type)
+    fname = "{libname}__{corner}{corner_suffix}.lib.json".format(
+        libname=libname, corner=corner, corner_suffix=corner_type.file)
+    return os.path.join("timing", fname)
+
+
+def _walk_cell_lib_json(cells_dir):
+    """Yield ``(cell, filename)`` pairs for the ``*.lib.json`` files of cells.
+
+    ``os.walk`` reads each directory with ``os.scandir`` internally, so the
+    file / directory distinction comes for free from the directory read and
+    no path objects are materialized for entries that are filtered out.
+    Any ``timing`` subdirectories are pruned before descent.
+    """
+    for dirpath, dirnames, filenames in os.walk(cells_dir):
+        if "timing" in dirnames:
+            dirnames.remove("timing")
+        cell = os.path.basename(dirpath)
+        for name in filenames:
+            if name.endswith(".lib.json"):
+                yield cell, name
+
+
+def collect(library_dir) -> Tuple[str, Dict[str, TimingType], List[str]]:
+    """Collect the timing information available in a library.
+
+    Returns
+    -------
+    libname : str
+        Name of the library.
+    corners : dict
+        Mapping of corner name to the TimingType flags found for it.
+    all_cells : list of str
+        Sorted names (including size suffix) of all cells with timing data.
+    """
+    if not isinstance(library_dir, pathlib.Path):
+        library_dir = pathlib.Path(library_dir)
+
+    libname0 = None
+    corners = {}
+    all_cells = set()
+    files_by_cell = {}
+    for cell, name in _walk_cell_lib_json(library_dir / "cells"):
+        files_by_cell.setdefault(cell, set()).add(name)
+
+        fname, fext = name.split('.', 1)
+
+        libname, cellname, corner = fname.split("__")
+        corner, corner_type = TimingType.parse(corner)
+
+        if libname0 is None:
+            libname0 = libname
+        assert libname == libname0, (libname, libname0)
+
+        all_cells.add(cellname)
+        if corner in corners:
+            corners[corner] |= corner_type
+        else:
+            corners[corner] = corner_type
+
+    assert libname0 is not None, library_dir
+    all_cells = sorted(all_cells)
+
+    # Sanity check that the corner data exists for every cell.  The
+    # filenames were already collected during the traversal, so these are
+    # purely in-memory membership tests rather than a stat syscall per
+    # (cell, corner, corner_type) tuple.
+    for cell_with_size in all_cells:
+        for corner, corner_types in corners.items():
+            for corner_type in corner_types.types:
+                fpath = cell_corner_file(
+                    libname0, cell_with_size, corner, corner_type)
+                cell_dir, fname = os.path.split(fpath)
+                cell = os.path.basename(cell_dir)
+                assert fname in files_by_cell.get(cell, ()), fpath
+
+    # Sanity check that the top level data exists for every corner.  One
+    # directory read gives all the filenames; membership tests replace a
+    # stat call per (corner, corner_type) pair.
+    with os.scandir(library_dir / "timing") as it:
+        timing_files = set(entry.name for entry in it)
+    for corner, corner_types in corners.items():
+        for corner_type in corner_types.types:
+            fpath = top_corner_file(libname0, corner, corner_type)
+            assert os.path.basename(fpath) in timing_files, fpath
+
+    return libname0, corners, all_cells
+
+
+def remove_ccsnoise(data):
+    """Remove ccsnoise data from a ``.lib.json`` data structure."""
+    ccsn_keys = [k for k in data if "ccsn_" in k]
+    for k in ccsn_keys:
+        del data[k]
+
+    for k, pin_data in data.items():
+        if not k.startswith("pin "):
+            continue
+
+        pin_data.pop("input_voltage", None)
+
+        for t in pin_data.get("timing", ()):
+            ccsn_keys = [tk for tk in t if tk.startswith("ccsn_")]
+            for tk in ccsn_keys:
+                del t[tk]
+
+
+_WIDTH = len(str(0.0083333333))
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def liberty_float(f):
+    """Format a value like liberty files expect.
+
+    The same index and table values repeat constantly across a library, so
+    the results are memoized.
+
+    >>> liberty_float(1.9322035e-38)
+    '1.9322035e-38'
+
+    >>> liberty_float(1e20)
+    '1.000000e+20'
+
+    >>> liberty_float(1)
+    '1.0000000000'
+
+    >>> liberty_float(0.5)
+    '0.5000000000'
+    """
+    s = repr(f)
+    if 'e' in s:
+        a, _, b = s.partition('e')
+        if '.' not in a:
+            a += '.'
+        s = a.ljust(_WIDTH - len(b) - 1, '0') + 'e' + b
+    elif '.' in s:
+        s = s.ljust(_WIDTH, '0')
+    elif len(s) < _WIDTH:
+        s = (s + '.').ljust(_WIDTH, '0')
+    return s
+
+
+LIBERTY_LISTS = frozenset(("variable", "index", "values"))
+
+
+def _split_liberty(k):
+    """Split a numbered liberty key into its base name and number.
+
+    >>> _split_liberty("index_3")
+    ('index', 3)
+    >>> _split_liberty("values")
+    ('values', None)
+    """
+    base, sep, tail = k.rpartition("_")
+    if sep and tail.isdigit():
+        return base, int(tail)
+    return k, None
+
+
+@functools.lru_cache(maxsize=4096)
+def is_liberty_list(k):
+    """Is this key a liberty list value?
+
+    >>> is_liberty_list("variable_1")
+    True
+    >>> is_liberty_list("index_3")
+    True
+    >>> is_liberty_list("values")
+    True
+    >>> is_liberty_list("value")
+    False
+    """
+    base, n = _split_liberty(k)
+    return base in LIBERTY_LISTS
+
+
+@functools.lru_cache(maxsize=4096)
+def liberty_sort(k):
+    """Generate a sort key for liberty keys.
+
+    >>> liberty_sort("variable_1")
+    (1, 'variable')
+    >>> liberty_sort("index_3")
+    (3, 'index')
+    >>> liberty_sort("values")
+    (0, 'values')
+    """
+    base, n = _split_liberty(k)
+    if n is None:
+        n = 0
+    return n, base
+
+
+def _join_floats(l):
+    return ", ".join(map(liberty_float, l))
+
+
+def _join_ints(l):
+    return ", ".join(map(str, l))
+
+
+def liberty_join(l):
+    """Get a function to join list elements into a liberty value string.
+
+    >>> liberty_join([1, 2, 3])([1, 2, 3])
+    '1, 2, 3'
+    >>> liberty_join([0.5, 1.0])([0.5, 1.0])
+    '0.5000000000, 1.0000000000'
+    """
+    if any(type(i) is float for i in l):
+        return _join_floats
+    if any(type(i) is int for i in l):
+        return _join_ints
+    raise ValueError("Unknown value types in {!r}".format(l))
+
+
+def liberty_list(write, k, v, indent):
+    """Write a liberty list value to the output."""
+    i_str = "    " * indent
+    if v and isinstance(v[0], list):
+        join = liberty_join(v[0])
+        prefix = i_str + '  "'
+        rows = [prefix + join(row) + '"' for row in v]
+        write('{}{}( \\\n'.format(i_str, k))
+        write(', \\\n'.join(rows) + ');\n')
+    else:
+        join = liberty_join(v)
+        write('{}{}("{}");\n'.format(i_str, k, join(v)))
+
+
+@functools.lru_cache(maxsize=4096)
+def attr_sort_key(k):
+    """Generate the sort key for a liberty attribute name.
+
+    The same attribute names repeat at every recursion level of
+    liberty_dict(), so the computed keys are memoized.
+    """
+    if " " in k:
+        ktype, kvalue = k.split(" ", 1)
+    else:
+        ktype = k
+        kvalue = ""
+    if is_liberty_list(ktype):
+        kn, ktype = liberty_sort(ktype)
+    else:
+        kn = 0
+    return ktype, kn, kvalue
+
+
+def liberty_dict(write, dtype, dname, data, indent=0, emit_close=True):
+    """Write a liberty dictionary to the output.
+
+    Lines are streamed straight to the ``write`` callable rather than
+    collected, so no intermediate list of the whole output is built.  With
+    ``emit_close=False`` the closing brace is left out, letting the caller
+    nest further groups into this one.
+    """
+    assert isinstance(data, dict), (dtype, dname, data)
+
+    i_str = "    " * indent
+    write('{}{} ("{}") {{\n'.format(i_str, dtype, dname))
+
+    # Split each key into its group type / name parts once, reusing the
+    # result for both the sort and the emit below.
+    items = []
+    for k, v in data.items():
+        if " " in k:
+            ktype, kvalue = k.split(" ", 1)
+        else:
+            ktype = k
+            kvalue = ""
+        items.append((attr_sort_key(k), k, ktype, kvalue, v))
+    items.sort(key=operator.itemgetter(0))
+
+    for _, k, ktype, kvalue, v in items:
+        if isinstance(v, dict):
+            liberty_dict(write, ktype, kvalue, v, indent + 1)
+        elif isinstance(v, list) and v and isinstance(v[0], dict):
+            # Lists of groups (pins, timing tables, ...) are ordered by the
+            # schema attributes that identify them; sorted() is stable, so
+            # entries with equal keys keep their input order.
+            v = sorted(
+                v,
+                key=lambda o: (o.get("name", ""), o.get("related_pin", "")))
+            for d in v:
+                liberty_dict(write, ktype, kvalue, d, indent + 1)
+        elif isinstance(v, list) and is_liberty_list(ktype):
+            liberty_list(write, k, v, indent + 1)
+        else:
+            if isinstance(v, str):
+                v = '"{}"'.format(v)
+            elif isinstance(v, bool):
+                v = "true" if v else "false"
+            elif isinstance(v, (int, float)):
+                v = liberty_float(v)
+            write('{}{} : {};\n'.format("    " * (indent + 1), k, v))
+
+    if emit_close:
+        write('{}}}\n'.format(i_str))
+
+
+def generate(library_dir, lib, corner, ocorner_type, icorner_type, cells):
+    """Generate the ``.lib`` file for a single corner of a library."""
+    top_fpath = os.path.join(
+        str(library_dir),
+        top_corner_file(lib, corner, ocorner_type)[:-len(".json")])
+
+    common_data = {}
+
+    # Load the common data shared between all corners.
+    common_fpath = os.path.join(
+        str(library_dir), "timing", "{}__common.lib.json".format(lib))
+    with open(common_fpath, "rb") as f:
+        d = _json.loads(f.read())
+    overlap = common_data.keys() & d.keys()
+    assert not overlap, overlap
+    common_data.update(d)
+
+    # Load the data for this corner.
+    corner_fpath = os.path.join(
+        str(library_dir), top_corner_file(lib, corner, icorner_type))
+    with open(corner_fpath, "rb") as f:
+        d = _json.loads(f.read())
+    overlap = common_data.keys() & d.keys()
+    assert not overlap, overlap
+    common_data.update(d)
+
+    # Stripping is only needed when the input data was read from a
+    # ccsnoise corner; data from other corners cannot contain ccsn_ keys,
+    # so there is no point walking every pin and timing entry.
+    needs_strip = (ocorner_type != TimingType.ccsnoise and
+                   icorner_type == TimingType.ccsnoise)
+
+    if needs_strip:
+        remove_ccsnoise(common_data)
+
+    # Liberty files are pure ASCII, so writing pre-encoded bytes through a
+    # large binary buffer skips the TextIOWrapper encode and locking
+    # machinery on every emitted line.
+    top_fout = open(top_fpath, "wb", buffering=1 << 20)
+
+    def write(s):
+        top_fout.write(s.encode("ascii"))
+
+    # The closing brace is held back so the cells below can be nested into
+    # the library group.
+    liberty_dict(
+        write, "library", "{}__{}".format(lib, corner), common_data,
+        emit_close=False)
+
+    # Reading the per-cell files dominates the runtime and each file is
+    # independent, so the reads are overlapped with a thread pool while the
+    # formatting below consumes the results in the original cell order.
+    def load_cell_data(cell_with_size):
+        fpath = os.path.join(
+            str(library_dir),
+            cell_corner_file(lib, cell_with_size, corner, icorner_type))
+        with open(fpath, "rb") as f:
+            return _json.loads(f.read())
+
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = {
+            executor.submit(load_cell_data, cell_with_size): cell_with_size
+            for cell_with_size in cells}
+        data_by_cell = {}
+        for future in concurrent.futures.as_completed(futures):
+            data_by_cell[futures[future]] = future.result()
+
+    for cell_with_size in cells:
+        cell_data = data_by_cell.pop(cell_with_size)
+
+        if needs_strip:
+            remove_ccsnoise(cell_data)
+
+        liberty_dict(
+            write, "cell", "{}__{}".format(lib, cell_with_size), cell_data,
+            indent=1)
+
+    write('}\n')
+    top_fout.close()
+
+    return top_fpath
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "library_path",
+        help="Path to the library directory.",
+        type=pathlib.Path)
+    parser.add_argument(
+        "corner",
+        help="Corners to write output for (defaults to all).",
+        nargs='*')
+    parser.add_argument(
+        "--ccsnoise",
+        help="Include ccsnoise in the output.",
+        action='store_true')
+    parser.add_argument(
+        "--leakage",
+        help="Generate power leakage output.",
+        action='store_true')
+    args = parser.parse_args(args)
+
+    if args.ccsnoise:
+        ocorner_type = TimingType.ccsnoise
+    elif args.leakage:
+        ocorner_type = TimingType.leakage
+    else:
+        ocorner_type = TimingType.basic
+
+    lib, corners, all_cells = collect(args.library_path)
+
+    for corner in (args.corner or sorted(corners)):
+        if corner not in corners:
+            print("Unknown corner: {} (available: {})".format(
+                corner, ", ".join(sorted(corners))))
+            return 1
+
+        corner_types = corners[corner]
+        if ocorner_type in corner_types.types:
+            icorner_type = ocorner_type
+        elif ocorner_type == TimingType.basic and \
+                TimingType.ccsnoise in corner_types.types:
+            # basic output can be generated by stripping a ccsnoise corner.
+            icorner_type = TimingType.ccsnoise
+        else:
+            print("Corner {} has no {} data (available: {})".format(
+                corner, ocorner_type.name,
+                ", ".join(t.name for t in corner_types.types)))
+            return 1
+
+        fpath = generate(
+            args.library_path, lib, corner, ocorner_type, icorner_type,
+            all_cells)
+        print("Wrote", fpath)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))